@@ -6,15 +6,25 @@ import plotly.graph_objects as go
 import plotly.io as pio
 from plotly.subplots import make_subplots
 import os
+import re
+import hashlib
+import threading
+import time
 from io import BytesIO
+import joblib
+from scipy import sparse
+from sklearn.linear_model import SGDRegressor
+from streamlit.logger import get_logger
 from streamlit_option_menu import option_menu
 
+# Logger Streamlit sudah punya handler dan level (config `logger.level`, default info)
+logger = get_logger(__name__)
+
 # ==============================
 # PAGE CONFIG
 # ==============================
 st.set_page_config(page_title="✈️ Dashboard Kelompok 2", layout="wide")
-st.markdown("""
-<style>
+BASE_CSS = """
 /* ====== Sidebar ====== */
 [data-testid="stSidebar"] {
     background-color: #0a1a3f; /* navy gelap */
@@ -88,16 +98,61 @@ h2, h3, h4, label, .st-emotion-cache-1v0mbdj, .st-emotion-cache-1cypcdb {
     color: white !important;
     font-weight: 600;
 }
-</style>
-""", unsafe_allow_html=True)
+"""
 
 # ==============================
 # OPTIONAL CUSTOM CSS
 # ==============================
 css_path = "style.css"
-if os.path.exists(css_path):
-    with open(css_path, "r", encoding="utf-8") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def build_stylesheet(css_mtime):
+    """Gabungkan BASE_CSS dan style.css lalu minify; dibangun sekali per proses."""
+    css = BASE_CSS
+    if css_mtime is not None:
+        with open(css_path, "r", encoding="utf-8") as f:
+            css += f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+# Streamlit membuang elemen yang tidak dikirim ulang saat rerun, jadi tag
+# <style> tetap dikirim tiap run; yang di-cache adalah baca file + minify.
+st.markdown(
+    build_stylesheet(os.path.getmtime(css_path) if os.path.exists(css_path) else None),
+    unsafe_allow_html=True
+)
+
+# ==============================
+# STATIC ASSETS
+# ==============================
+HOME_IMAGES = {"upn_logo.png": 130, "airplane_icon.png": 120}  # lebar tampilan (px)
+IMAGE_PIXEL_RATIO = 2  # varian 2x agar tetap tajam di layar HiDPI
+
+@st.cache_resource(show_spinner=False)
+def display_image(path, width, mtime):
+    """Varian gambar IMAGE_PIXEL_RATIO x lebar tampilan (tidak melebihi ukuran asli),
+    di-resize lalu disimpan sebagai PNG palet terkompresi."""
+    from PIL import Image
+    with Image.open(path) as img:
+        img = img.convert("RGBA")
+        width = min(width * IMAGE_PIXEL_RATIO, img.width)
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+        img = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+        buf = BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+# Disiapkan saat startup dan disajikan dari memori; file asli jadi fallback
+home_images = {}
+for image_path, image_width in HOME_IMAGES.items():
+    try:
+        home_images[image_path] = display_image(image_path, image_width, os.path.getmtime(image_path))
+    except Exception as e:
+        logger.warning("gagal menyiapkan %s: %s", image_path, e)
+        home_images[image_path] = image_path
 
 # ==============================
 # COLOR PALETTE
@@ -119,52 +174,848 @@ color_palette = [
 # LOAD DATA
 # ==============================
 DEFAULT_FILE = "flights_cleaned_fix.parquet"
-
-@st.cache_data
-def load_data(path):
-    if path.endswith(".parquet"):
-        df = pd.read_parquet(path)
+PREVIEW_ROWS = 5000  # jumlah baris untuk tampilan awal (preliminary)
+PREVIEW_ROW_GROUPS = 10  # parquet: preview diambil dari row group yang tersebar rata
+PREVIEW_GRACE_S = 0.25  # tunggu sebentar: cache Arrow yang sudah ada terbuka dalam milidetik
+DATA_CACHE_DIR = ".data_cache"
+LOADER_MAX_ENTRIES = 4  # dataset (upload) yang loader-nya tetap disimpan di memori
+PREP_VERSION = 1     # naikkan bila prepare_data berubah agar cache Arrow lama tidak dipakai
+# Batas total ukuran cache Arrow (byte), bisa diatur lewat environment
+DATA_CACHE_MAX_BYTES = int(os.environ.get("DATA_CACHE_MAX_BYTES", 2_000_000_000))
+
+# Data dibagi antar sesi (cache_resource), jadi aktifkan copy-on-write supaya
+# perubahan kolom di satu rerun tidak menimpa DataFrame milik sesi lain.
+# Sejak pandas 3 copy-on-write selalu aktif dan opsinya deprecated.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+def load_data(source, name, nrows=None):
+    if name.endswith(".parquet"):
+        if nrows is None:
+            df = pd.read_parquet(source)
+        else:
+            # Ambil potongan dari row group yang tersebar rata di seluruh file,
+            # supaya preview tidak hanya berisi tanggal-tanggal awal
+            import pyarrow.parquet as pq
+            pf = pq.ParquetFile(source)
+            n_groups = pf.num_row_groups
+            picks = np.unique(np.linspace(0, n_groups - 1, min(n_groups, PREVIEW_ROW_GROUPS)).astype(int))
+            per_group = max(1, nrows // max(len(picks), 1))
+            batches = [
+                next(pf.iter_batches(batch_size=per_group, row_groups=[int(i)]), None)
+                for i in picks
+            ]
+            frames = [b.to_pandas() for b in batches if b is not None]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     else:
-        df = pd.read_csv(path)
+        df = pd.read_csv(source, nrows=nrows)
     df = df.loc[:, ~df.columns.duplicated()]
     return df
 
-df = None
-if os.path.exists(DEFAULT_FILE):
+@st.cache_data(show_spinner=False)
+def dataset_fingerprint(source_key, _read_source):
+    """Sidik jari dataset: path+ukuran+mtime untuk file lokal, isi file untuk upload.
+
+    Untuk upload seluruh isi di-hash (sekali per file_id, file sudah di memori):
+    sidik jari ini menjadi kunci cache Arrow dan model, jadi perubahan kecil
+    di tengah file pun harus menghasilkan kunci baru.
+    """
+    source = _read_source()
+    digest = hashlib.blake2b(digest_size=8)
+    if isinstance(source, str):
+        digest.update(source_key.encode("utf-8"))
+    else:
+        digest.update(source.getbuffer())
+    return digest.hexdigest()
+
+# ==============================
+# CLEANING
+# ==============================
+def prepare_data(df):
+    df = df.copy()
+    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+    numeric_cols = ["dep_delay","arr_delay","total_delay","distance","air_time",
+                    "humidity","pressure","temperature","wind_speed","delay_difference","temperature_c"]
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    for col in ["dep_time", "sched_dep_time", "arr_time", "sched_arr_time"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    # Kode bin integer jam & hari (sekali saja di sini; -1 untuk waktu kosong)
+    if "sched_dep_time" in df.columns:
+        df["sched_hour"] = df["sched_dep_time"].dt.hour.fillna(-1).astype("int8")
+        df["sched_weekday"] = df["sched_dep_time"].dt.weekday.fillna(-1).astype("int8")
+    return df
+
+# ==============================
+# SHARED ARROW CACHE
+# ==============================
+def arrow_cache_path(fingerprint):
+    return os.path.join(DATA_CACHE_DIR, f"flights_{fingerprint}_v{PREP_VERSION}.arrow")
+
+def arrow_to_pandas(table):
+    import pyarrow as pa
+    # split_blocks: kolom numerik tanpa null tetap menunjuk ke buffer Arrow (zero-copy);
+    # string dibaca sebagai string[pyarrow] agar tidak disalin menjadi objek Python.
+    return table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+def write_arrow_cache(df, path):
+    """Tulis dataset siap pakai ke file Arrow IPC tanpa kompresi (bisa di-mmap)."""
+    import pyarrow as pa
+    arrays = {}
+    for col in df.columns:
+        if df[col].dtype.kind == "f":
+            # NaN disimpan sebagai nilai, bukan null, supaya kolom float bisa zero-copy
+            arrays[col] = pa.array(df[col].to_numpy(), from_pandas=False)
+        else:
+            arrays[col] = pa.array(df[col], from_pandas=True)
+    table = pa.table(arrays)
+
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    # Tulis ke file sementara lalu rename atomik: proses lain tidak pernah
+    # melihat file setengah jadi, dan penulis ganda cukup saling menimpa.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        df = load_data(DEFAULT_FILE)
-        st.sidebar.success(f"✅ File dimuat: {DEFAULT_FILE}")
-    except Exception as e:
-        st.sidebar.error(f"Gagal membaca file lokal: {e}")
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    prune_arrow_cache(keep=path)
+
+def prune_arrow_cache(keep):
+    """Hapus file cache yang paling lama tidak dipakai sampai total <= DATA_CACHE_MAX_BYTES.
+
+    File `keep` tidak pernah dihapus. Versi lama (PREP_VERSION atau isi file
+    yang sudah berubah) otomatis tersingkir karena tidak dibuka lagi.
+    """
+    entries = []
+    for entry in os.scandir(DATA_CACHE_DIR):
+        if entry.name.endswith(".arrow") and entry.is_file():
+            info = entry.stat()
+            entries.append((info.st_mtime, info.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= DATA_CACHE_MAX_BYTES:
+            break
+        if os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            # Di POSIX proses yang masih me-mmap file ini tetap aman: inode
+            # baru dilepas saat mapping terakhir ditutup.
+            os.remove(path)
+            total -= size
+        except OSError as e:
+            logger.warning("cache Arrow %s tidak bisa dihapus: %s", path, e)
+
+def open_arrow_cache(path):
+    """Buka file Arrow IPC memory-mapped; semua proses server berbagi page cache OS."""
+    import pyarrow as pa
+    # Sentuh mtime sebagai penanda terakhir dipakai untuk prune_arrow_cache
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return arrow_to_pandas(table)
+
+# ==============================
+# BACKGROUND LOADING
+# ==============================
+class BackgroundLoader:
+    """Memuat dataset penuh di thread terpisah.
+
+    Bila cache Arrow untuk dataset ini sudah ada (dibuat proses mana pun),
+    file itu langsung di-mmap. Jika belum, dataset dibaca, dibersihkan,
+    ditulis ke cache, lalu dibuka ulang via mmap sehingga salinan privat
+    hasil parsing bisa dilepas.
+    """
+
+    def __init__(self, read_source, name, cache_path):
+        self.name = name
+        self.df = None
+        self.error = None
+        self.memory_mapped = False
+        self._done = threading.Event()
+        threading.Thread(target=self._run, args=(read_source, cache_path), daemon=True).start()
+
+    def _run(self, read_source, cache_path):
+        try:
+            if not os.path.exists(cache_path):
+                df = prepare_data(load_data(read_source(), self.name))
+                try:
+                    write_arrow_cache(df, cache_path)
+                except Exception as e:
+                    # Cache hanya optimasi: disk penuh, izin, atau tipe kolom yang
+                    # tidak bisa dikonversi ke Arrow tidak boleh menggagalkan load.
+                    logger.warning("cache Arrow %s tidak bisa ditulis: %s", cache_path, e)
+                    self.df = df
+                    return
+                del df
+            self.df = open_arrow_cache(cache_path)
+            self.memory_mapped = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+# validate: loader yang gagal (mis. file cache dihapus proses lain di tengah
+# jalan) tidak dipakai ulang, jadi rerun berikutnya mencoba memuat lagi.
+@st.cache_resource(show_spinner=False, max_entries=LOADER_MAX_ENTRIES, validate=lambda loader: loader.error is None)
+def get_loader(source_key, name, cache_path, _read_source):
+    return BackgroundLoader(_read_source, name, cache_path)
+
+@st.cache_data(show_spinner=False, max_entries=LOADER_MAX_ENTRIES)
+def load_preview(source_key, name, _read_source):
+    return prepare_data(load_data(_read_source(), name, nrows=PREVIEW_ROWS))
+
+@st.fragment(run_every=1.0)
+def await_full_data(loader):
+    # Rerun seluruh halaman begitu dataset penuh siap, supaya semua view
+    # berganti dari hasil sementara ke hasil exact.
+    if loader.ready():
+        st.rerun()
+
+source_key = None
+if os.path.exists(DEFAULT_FILE):
+    stat = os.stat(DEFAULT_FILE)
+    source_key = f"{os.path.abspath(DEFAULT_FILE)}:{stat.st_size}:{stat.st_mtime_ns}"
+    source_name = DEFAULT_FILE
+    read_source = lambda: DEFAULT_FILE
 else:
     uploaded = st.sidebar.file_uploader("📂 Upload dataset (CSV/Parquet)", type=["csv", "parquet"])
     if uploaded:
+        source_key = uploaded.file_id
+        source_name = uploaded.name
+        uploaded_bytes = uploaded.getvalue()
+        read_source = lambda: BytesIO(uploaded_bytes)
+
+df = None
+is_preliminary = False
+if source_key is not None:
+    data_fingerprint = dataset_fingerprint(source_key, read_source)
+    loader = get_loader(source_key, source_name, arrow_cache_path(data_fingerprint), read_source)
+    loader.wait(PREVIEW_GRACE_S)
+    if loader.ready():
+        if loader.error is not None:
+            st.sidebar.error(f"Gagal membaca file {source_name}: {loader.error}")
+        else:
+            df = loader.df
+            st.sidebar.success(f"✅ File dimuat: {source_name}" + (" (memory-mapped)" if loader.memory_mapped else ""))
+    else:
+        with st.sidebar:
+            await_full_data(loader)
         try:
-            if uploaded.name.endswith(".parquet"):
-                df = pd.read_parquet(uploaded)
-            else:
-                df = pd.read_csv(uploaded)
-            st.sidebar.success("✅ Dataset berhasil di-upload.")
+            df = load_preview(source_key, source_name, read_source)
+            is_preliminary = True
+            preview_rows = "baris dari seluruh file" if source_name.endswith(".parquet") else "baris pertama file"
+            st.sidebar.info(
+                f"⏳ Memuat dataset penuh di latar belakang. "
+                f"Hasil sementara (preliminary) dari {len(df):,} {preview_rows}; "
+                f"rentang filter diperbarui saat data penuh siap."
+            )
         except Exception as e:
-            st.sidebar.error(f"Gagal memuat file upload: {e}")
+            st.sidebar.error(f"Gagal membaca preview {source_name}: {e}")
 
 if df is None:
     st.warning("⚠️ Silakan upload file dataset atau pastikan file lokal tersedia.")
     st.stop()
 
+# Salinan dangkal per rerun: kolom baru/diubah di halaman tidak ikut ke data bersama
+df = df.copy(deep=False)
+# Kunci cache untuk hasil turunan dataset aktif (preview dan data penuh dibedakan)
+data_key = f"{source_key}:{'preview' if is_preliminary else 'full'}"
+
+def preliminary_note():
+    if is_preliminary:
+        st.caption("⏳ **Preliminary** — dihitung dari sebagian data; akan diperbarui otomatis saat dataset penuh siap.")
+
 # ==============================
-# CLEANING
+# APPROXIMATE QUERY
+# ==============================
+APPROX_START_ROWS = 1000     # ukuran sampel awal, digandakan tiap langkah
+APPROX_MIN_GROUP_ROWS = 30   # grup dengan sampel lebih kecil dihitung exact
+Z_95 = 1.96
+
+def sample_rows(n_rows, n):
+    # Sampel acak dengan pengembalian: O(n), tanpa permutasi seluruh data
+    return np.random.default_rng(42).integers(0, n_rows, size=n)
+
+def progressive_refine(n_rows, estimate, target_ci=None, budget_ms=None, t0=None):
+    """Jalankan `estimate(idx)` pada sampel yang makin besar.
+
+    `idx` adalah posisi baris sampel, atau None untuk seluruh data (exact).
+    `estimate` mengembalikan (hasil, ci_terbesar). Berhenti saat ci <= target_ci
+    atau saat langkah berikutnya diperkirakan melewati budget_ms, dihitung
+    sejak `t0`. Bila sampel berikutnya sudah lebih dari separuh data, langsung
+    dihitung exact. Tanpa target dan budget, langsung exact.
+    """
+    t0 = time.perf_counter() if t0 is None else t0
+    if (target_ci is None and budget_ms is None) or n_rows <= 2 * APPROX_START_ROWS:
+        return estimate(None)[0], n_rows
+
+    n = APPROX_START_ROWS
+    while True:
+        t_step = time.perf_counter()
+        result, ci = estimate(sample_rows(n_rows, n))
+        now = time.perf_counter()
+        if target_ci is not None and ci <= target_ci:
+            return result, n
+        exact_next = n * 4 > n_rows
+        # Biaya langkah berikutnya: 2x sampel, atau satu pass penuh bila exact
+        next_cost = (now - t_step) * (n_rows / n if exact_next else 2)
+        if budget_ms is not None and (now - t0 + next_cost) * 1000 > budget_ms:
+            return result, n
+        if exact_next:
+            return estimate(None)[0], n_rows
+        n *= 2
+
+def approx_mean(df, col, target_ci=None, budget_ms=None):
+    """Rata-rata `col` dengan setengah lebar CI 95%. Mengembalikan (mean, ci, n_sampel)."""
+    t0 = time.perf_counter()
+    values = df[col].to_numpy(dtype=float)
+
+    def estimate(idx):
+        x = values if idx is None else values[idx]
+        x = x[~np.isnan(x)]
+        if idx is None:
+            return (x.mean() if len(x) else float("nan"), 0.0), 0.0
+        if len(x) < 2:
+            return (float("nan"), float("nan")), float("inf")
+        ci = Z_95 * x.std(ddof=1) / np.sqrt(len(x))
+        return (x.mean(), ci), ci
+
+    (mean, ci), n_used = progressive_refine(len(values), estimate, target_ci, budget_ms, t0)
+    return mean, ci, n_used
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def group_index(data_key, by, col, _df):
+    """Indeks grup per dataset untuk approx_group_mean.
+
+    Berisi kode grup per baris (-1 bila key atau nilai kosong), kategori,
+    jumlah baris valid per grup, serta posisi baris terurut per grup beserta
+    offset awalnya, sehingga grup kecil bisa dihitung exact tanpa memindai
+    seluruh data.
+    """
+    codes, uniques = pd.factorize(_df[by])
+    valid = (codes >= 0) & ~np.isnan(_df[col].to_numpy(dtype=float))
+    # int16 bila muat: argsort stabil numpy memakai radix sort untuk tipe ini
+    code_dtype = np.int16 if len(uniques) < 2 ** 15 else np.int32
+    codes = np.where(valid, codes, -1).astype(code_dtype)
+    pop_counts = np.bincount(codes[valid], minlength=len(uniques))
+    # Kode -1 berada di depan setelah diurutkan; lewati
+    order = np.argsort(codes, kind="stable")[len(codes) - int(valid.sum()):]
+    starts = np.concatenate([[0], np.cumsum(pop_counts)])
+    return codes, uniques, pop_counts, order, starts
+
+def approx_group_mean(data_key, df, by, col, target_ci=None, budget_ms=None):
+    """Rata-rata `col` per grup `by` dengan CI 95%.
+
+    Setiap grup yang di sampel akhir punya kurang dari APPROX_MIN_GROUP_ROWS
+    baris dihitung exact lewat group_index, sehingga aturan berhenti (yang
+    hanya melihat grup dengan sampel cukup) berlaku untuk semua grup.
+    Mengembalikan DataFrame [by, col, 'ci', 'n', 'exact'], ukuran sampel, dan
+    jumlah baris data.
+    """
+    t0 = time.perf_counter()
+    codes, uniques, pop_counts, order, starts = group_index(data_key, by, col, df)
+    values = df[col].to_numpy(dtype=float)
+    n_groups = len(uniques)
+
+    def estimate(idx):
+        c = codes if idx is None else codes[idx]
+        x = values if idx is None else values[idx]
+        keep = c >= 0
+        c, x = c[keep], x[keep]
+        counts = np.bincount(c, minlength=n_groups)
+        sums = np.bincount(c, weights=x, minlength=n_groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sums / counts
+            if idx is None:
+                return (mean, np.zeros(n_groups), counts), 0.0
+            sq_sums = np.bincount(c, weights=x * x, minlength=n_groups)
+            var = np.clip((sq_sums - counts * mean ** 2) / (counts - 1), 0, None)
+            ci = Z_95 * np.sqrt(var / counts)
+        eligible = counts >= APPROX_MIN_GROUP_ROWS
+        worst = ci[eligible].max() if eligible.any() else float("inf")
+        return (mean, ci, counts), worst
+
+    (mean, ci, counts), n_used = progressive_refine(len(codes), estimate, target_ci, budget_ms, t0)
+
+    # Fallback exact untuk grup dengan sampel terlalu sedikit; grup seperti ini
+    # kecil di populasi, jadi biayanya kecil dibanding pemindaian penuh
+    small = (counts < APPROX_MIN_GROUP_ROWS) & (pop_counts > 0)
+    if n_used < len(codes) and small.any():
+        small_ids = np.flatnonzero(small)
+        rows = np.concatenate([order[starts[g]:starts[g + 1]] for g in small_ids])
+        sums = np.bincount(codes[rows], weights=values[rows], minlength=n_groups)
+        mean, ci, counts = mean.copy(), ci.copy(), counts.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean[small] = sums[small] / pop_counts[small]
+        ci[small] = 0.0
+        counts[small] = pop_counts[small]
+    else:
+        small = np.zeros(n_groups, dtype=bool)
+
+    result = pd.DataFrame({by: uniques, col: mean, "ci": ci, "n": counts, "exact": small})
+    result = result[pop_counts > 0]
+    return result.sort_values(by).reset_index(drop=True), n_used, len(codes)
+
+def fmt_ci(value, ci, fmt=".2f"):
+    if pd.isna(value):
+        return "N/A"
+    if pd.isna(ci) or ci == 0:
+        return f"{value:{fmt}}"
+    return f"{value:{fmt}} ± {ci:{fmt}}"
+
+def approx_caption(n_used, n_total, group_result=None):
+    if n_used >= n_total:
+        return
+    text = f"≈ Estimasi dari sampel acak {n_used:,} dari {n_total:,} baris (CI 95%)."
+    if group_result is not None and group_result["exact"].any():
+        text += f" {int(group_result['exact'].sum())} grup kecil dihitung exact."
+    st.caption(text)
+
+# ==============================
+# AIRCRAFT ROTATION
+# ==============================
+ROTATION_MAX_GAP_H = 12     # jeda antar leg lebih dari ini dianggap rotasi baru
+ROTATION_MIN_TURN_MIN = 30  # waktu turnaround minimum yang tidak bisa menyerap delay
+ROTATION_COLS = ["tailnum", "sched_dep_time", "sched_arr_time", "dep_delay", "arr_delay"]
+
+def compute_rotations(df):
+    """Susun rantai rotasi per pesawat dan pisahkan delay propagasi vs orisinal.
+
+    Seluruh perhitungan vektor di atas layout terurut (tailnum, sched_dep_time):
+    leg sebelumnya diambil dengan shift satu posisi, batas pesawat/rotasi
+    ditandai mask, dan nomor leg dihitung dari posisi awal segmen. Tidak ada
+    loop per pesawat.
+
+    Kolom tambahan per leg:
+      chain_id, leg_no   : id rotasi dan urutan leg di dalamnya (mulai 1)
+      slack_min          : jeda terjadwal sejak kedatangan leg sebelumnya (menit)
+      inbound_delay      : arr_delay leg sebelumnya dalam rotasi yang sama
+      propagated_delay   : bagian dep_delay yang terbawa dari leg sebelumnya
+      originated_delay   : sisa dep_delay yang muncul di leg ini
+    """
+    extra = [c for c in ["carrier", "origin", "dest"] if c in df.columns]
+    legs = df[ROTATION_COLS + extra].dropna(subset=["tailnum", "sched_dep_time"])
+    tail_codes, _ = pd.factorize(legs["tailnum"])
+    dep = legs["sched_dep_time"].to_numpy(dtype="datetime64[ns]")
+    order = np.lexsort((dep.view("i8"), tail_codes))
+    legs = legs.iloc[order].reset_index(drop=True)
+    tail_codes, dep = tail_codes[order], dep[order]
+
+    sched_arr = legs["sched_arr_time"].to_numpy(dtype="datetime64[ns]")
+    dep_delay = np.clip(legs["dep_delay"].fillna(0).to_numpy(dtype=float), 0, None)
+    arr_delay = legs["arr_delay"].fillna(0).to_numpy(dtype=float)
+    n = len(legs)
+
+    # Jeda terjadwal terhadap leg sebelumnya (NaT -> NaN)
+    slack = np.full(n, np.nan)
+    slack[1:] = (dep[1:] - sched_arr[:-1]) / np.timedelta64(1, "m")
+
+    # Rotasi baru saat pesawat berganti atau jeda terlalu panjang / tidak diketahui
+    new_chain = np.ones(n, dtype=bool)
+    new_chain[1:] = (tail_codes[1:] != tail_codes[:-1]) | ~(slack[1:] <= ROTATION_MAX_GAP_H * 60)
+    slack[new_chain] = np.nan
+
+    chain_id = np.cumsum(new_chain) - 1
+    leg_no = np.arange(n) - np.flatnonzero(new_chain)[chain_id] + 1
+
+    inbound = np.zeros(n)
+    inbound[1:] = arr_delay[:-1]
+    inbound[new_chain] = 0.0
+
+    # Delay masuk yang melebihi buffer turnaround terbawa ke keberangkatan berikutnya
+    buffer = np.clip(np.nan_to_num(slack) - ROTATION_MIN_TURN_MIN, 0, None)
+    propagated = np.minimum(dep_delay, np.clip(inbound - buffer, 0, None))
+
+    return legs.assign(
+        chain_id=chain_id,
+        leg_no=leg_no,
+        slack_min=slack,
+        inbound_delay=inbound,
+        propagated_delay=propagated,
+        originated_delay=dep_delay - propagated,
+    )
+
+def summarize_rotations(legs):
+    """Ringkasan per pesawat dari hasil compute_rotations."""
+    summary = legs.groupby("tailnum", sort=False).agg(
+        legs=("leg_no", "size"),
+        chains=("chain_id", "nunique"),
+        mean_slack_min=("slack_min", "mean"),
+        propagated_delay=("propagated_delay", "sum"),
+        originated_delay=("originated_delay", "sum"),
+    )
+    total = summary["propagated_delay"] + summary["originated_delay"]
+    summary["propagated_share"] = (summary["propagated_delay"] / total.where(total > 0)).fillna(0)
+    return summary.sort_values("propagated_delay", ascending=False).reset_index()
+
+@st.cache_data(show_spinner=False)
+def cached_rotations(data_key, _df):
+    # Hanya ringkasan kecil yang di-cache; frame per leg tidak ikut di-pickle
+    legs = compute_rotations(_df)
+    slack = legs.loc[legs["leg_no"] > 1, "slack_min"].to_numpy()
+    slack_counts, slack_edges = np.histogram(slack, bins=50) if len(slack) else (np.array([]), np.array([]))
+    return {
+        "tail_summary": summarize_rotations(legs),
+        "n_connected": len(slack),
+        "slack_median": float(np.median(slack)) if len(slack) else float("nan"),
+        "slack_counts": slack_counts,
+        "slack_edges": slack_edges,
+        "propagated_total": float(legs["propagated_delay"].sum()),
+        "originated_total": float(legs["originated_delay"].sum()),
+    }
+
+# ==============================
+# TIME-OF-DAY HEATMAP
+# ==============================
+WEEKDAY_LABELS = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+def binned_mean(row_codes, col_codes, values, n_rows, n_cols):
+    """Rata-rata `values` per sel (row, col) dengan satu pass bincount.
+
+    Kode negatif dan nilai NaN diabaikan; sel tanpa data bernilai NaN.
+    """
+    valid = (row_codes >= 0) & (col_codes >= 0) & ~np.isnan(values)
+    key = row_codes[valid].astype(np.int64) * n_cols + col_codes[valid]
+    sums = np.bincount(key, weights=values[valid], minlength=n_rows * n_cols)
+    counts = np.bincount(key, minlength=n_rows * n_cols)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sums / counts
+    return mean.reshape(n_rows, n_cols)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_time_heatmaps(data_key, filter_state, value_col, _df):
+    hours = _df["sched_hour"].to_numpy()
+    values = _df[value_col].to_numpy(dtype=float)
+
+    by_weekday = pd.DataFrame(
+        binned_mean(_df["sched_weekday"].to_numpy(), hours, values, 7, 24),
+        index=WEEKDAY_LABELS, columns=range(24)
+    )
+    origin_codes, origins = pd.factorize(_df["origin"])
+    by_origin = pd.DataFrame(
+        binned_mean(origin_codes, hours, values, len(origins), 24),
+        index=list(origins), columns=range(24)
+    ).sort_index()
+    return by_weekday, by_origin
+
+# ==============================
+# CHART PAYLOAD
 # ==============================
-df = df.copy()
-df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
-numeric_cols = ["dep_delay","arr_delay","total_delay","distance","air_time",
-                "humidity","pressure","temperature","wind_speed","delay_difference","temperature_c"]
-for col in numeric_cols:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+# Budget ukuran serialisasi per chart (byte), bisa diatur lewat environment
+CHART_BYTES_BUDGET = int(os.environ.get("CHART_BYTES_BUDGET", 1_000_000))
+CHART_DECIMALS = 3          # presisi tampilan untuk nilai float di payload
+CHART_MIN_POINTS = 1000     # downsampling tidak pernah memotong di bawah ini
+CHART_LAYOUT_BYTES = 8_000  # perkiraan layout + template per figure
+POINT_ATTRS = [
+    "x", "y", "z", "r", "theta", "customdata", "text", "hovertext", "ids",
+    "marker.size", "marker.color", "marker.symbol", "error_x.array", "error_y.array",
+]
+SCATTER_TYPES = {"scatter", "scattergl", "scatterpolar", "scatterpolargl"}
+HISTOGRAM_TYPES = {"histogram", "histogram2d", "histogram2dcontour"}
 
-if "date" in df.columns:
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+def _trace_get(trace, path):
+    try:
+        return trace[path]
+    except (KeyError, ValueError):
+        return None
+
+def _quantize(values):
+    # Float -> float32 dibulatkan ke presisi tampilan, int64 -> int32 bila muat.
+    # Array numpy ini diserialisasi Plotly sebagai typed array base64.
+    arr = np.asarray(values)
+    if arr.dtype.kind == "f":
+        return np.round(arr, CHART_DECIMALS).astype(np.float32)
+    if arr.dtype.kind in "iu" and arr.dtype.itemsize > 4 and (arr.size == 0 or np.abs(arr).max() < 2 ** 31):
+        return arr.astype(np.int32)
+    return None
+
+def slim_figure(fig):
+    """Buang customdata yang tidak dipakai dan kuantisasi array numerik tiap trace."""
+    for trace in fig.data:
+        template = _trace_get(trace, "hovertemplate")
+        if _trace_get(trace, "customdata") is not None and "customdata" not in (template or ""):
+            trace.customdata = None
+
+        quantized = []
+        for path in POINT_ATTRS:
+            values = _trace_get(trace, path)
+            if values is None or isinstance(values, str) or np.ndim(values) == 0:
+                continue
+            slim = _quantize(values)
+            if slim is not None:
+                # Plotly mengabaikan assignment yang nilainya "sama"; float32/int32
+                # yang setara dengan array lama baru tersimpan setelah dikosongkan.
+                trace[path] = None
+                trace[path] = slim
+                if slim.dtype.kind == "f":
+                    quantized.append(path)
+
+        # Float32 tampil dengan digit sisa di browser; samakan format teks/hover
+        if quantized and trace.type not in HISTOGRAM_TYPES:
+            pattern = "|".join(re.escape(p) + (r"\[\d+\]" if p == "customdata" else "") for p in quantized)
+            for attr in ("hovertemplate", "texttemplate"):
+                text = _trace_get(trace, attr)
+                if isinstance(text, str):
+                    trace[attr] = re.sub(
+                        r"%\{(" + pattern + r")\}",
+                        lambda m: f"%{{{m.group(1)}:.{CHART_DECIMALS}~f}}",
+                        text
+                    )
+
+def drop_hover_extras(fig):
+    """Hapus kolom hover tambahan (customdata) beserta barisnya di hovertemplate."""
+    for trace in fig.data:
+        if _trace_get(trace, "customdata") is None:
+            continue
+        trace.customdata = None
+        template = _trace_get(trace, "hovertemplate")
+        if isinstance(template, str):
+            trace.hovertemplate = "<br>".join(
+                line for line in template.split("<br>") if "customdata" not in line
+            )
+
+def downsample_figure(fig, ratio):
+    """Ambil titik berjarak rata dari trace scatter besar; kembalikan (tampil, total)."""
+    shown = total = 0
+    for trace in fig.data:
+        if trace.type not in SCATTER_TYPES:
+            continue
+        base = next((v for v in (_trace_get(trace, p) for p in ("x", "y", "r")) if v is not None), None)
+        if base is None:
+            continue
+        n = len(base)
+        keep_n = min(n, max(CHART_MIN_POINTS, int(n * ratio)))
+        total += n
+        shown += keep_n
+        if keep_n >= n:
+            continue
+        keep = np.linspace(0, n - 1, keep_n).astype(np.int64)
+        for path in POINT_ATTRS:
+            values = _trace_get(trace, path)
+            if values is None or isinstance(values, str) or np.ndim(values) == 0 or len(values) != n:
+                continue
+            trace[path] = np.asarray(values)[keep]
+    return shown, total
+
+def _array_bytes(values):
+    arr = np.asarray(values)
+    if arr.dtype.kind in "fiub":
+        return arr.nbytes * 4 // 3  # typed array base64
+    if arr.dtype.kind in "Mm":
+        return arr.size * 30        # string ISO per nilai
+    # Teks/kategori: rata-rata panjang dari sebagian elemen
+    head = arr.ravel()[:1000]
+    per_item = sum(len(str(v)) + 3 for v in head) / max(len(head), 1)
+    return int(per_item * arr.size)
+
+def estimate_payload_bytes(fig):
+    """Perkiraan ukuran serialisasi dari ukuran array per trace, tanpa to_json."""
+    total = CHART_LAYOUT_BYTES
+    for trace in fig.data:
+        for path in POINT_ATTRS:
+            values = _trace_get(trace, path)
+            if values is None or isinstance(values, str) or np.ndim(values) == 0:
+                continue
+            total += _array_bytes(values)
+    return total
+
+def render_chart(fig, name=None, budget=CHART_BYTES_BUDGET):
+    """Tampilkan figure Plotly setelah payload-nya dirampingkan.
+
+    Keputusan budget memakai perkiraan dari ukuran array: bila melebihi budget,
+    kolom hover tambahan dibuang lebih dulu, lalu trace scatter di-downsample.
+    Perkiraan yang sama dicatat ke log per chart, jadi figure hanya
+    diserialisasi sekali, oleh st.plotly_chart.
+    """
+    name = name or fig.layout.title.text or "chart"
+    slim_figure(fig)
+    size = estimate_payload_bytes(fig)
+    if size > budget:
+        drop_hover_extras(fig)
+        size = estimate_payload_bytes(fig)
+    shown = total = None
+    for _ in range(3):
+        if size <= budget:
+            break
+        # Sisakan 10% ruang untuk layout dan bagian figure yang tidak ikut mengecil
+        shown, n_points = downsample_figure(fig, 0.9 * budget / size)
+        total = total or n_points
+        new_size = estimate_payload_bytes(fig)
+        if new_size >= size:
+            break
+        size = new_size
+
+    if size > budget:
+        logger.warning("chart %r: ~%d bytes, melebihi budget %d", name, size, budget)
+    else:
+        logger.info("chart %r: ~%d bytes (budget %d)", name, size, budget)
+
+    st.plotly_chart(fig, use_container_width=True)
+    if total and shown < total:
+        st.caption(f"⚡ Menampilkan {shown:,} dari {total:,} titik agar chart tetap ringan.")
+
+# ==============================
+# DELAY PREDICTION MODEL
+# ==============================
+MODEL_DIR = ".model_cache"
+MODEL_VERSION = 2            # naikkan bila fitur/model berubah agar file lama tidak dipakai
+MODEL_CHUNK_ROWS = 100_000   # baris per partial_fit
+MODEL_EPOCHS = 3
+MODEL_VALIDATION_SPLITS = 10  # epoch pertama: chunk dipecah agar validasi juga jalan di data kecil
+MODEL_HASH_BUCKETS = 512     # bucket hash per fitur kategori
+MODEL_TARGET_SCALE = 60.0    # target dilatih dalam jam agar langkah SGD stabil
+MODEL_CAT_FEATURES = ["carrier", "origin", "dest", "route", "hour"]
+MODEL_NUM_FEATURES = ["humidity", "pressure", "temperature", "wind_speed", "wind_direction"]
+MODEL_REQUIRED = ["carrier", "origin", "dest", "sched_hour"]
+
+def iter_chunks(source, name, chunk_rows):
+    """Baca dataset per chunk yang sudah dibersihkan, tanpa memuat semuanya ke RAM."""
+    if name.endswith(".arrow"):
+        # Cache Arrow sudah berisi data siap pakai; batch dibaca langsung dari mmap
+        import pyarrow as pa
+        with pa.memory_map(source, "r") as mm:
+            table = pa.ipc.open_file(mm).read_all()
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield arrow_to_pandas(batch)
+        return
+    if name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        chunks = (b.to_pandas() for b in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows))
+    else:
+        chunks = pd.read_csv(source, chunksize=chunk_rows)
+    for chunk in chunks:
+        yield prepare_data(chunk.loc[:, ~chunk.columns.duplicated()])
+
+def _hash_codes(series):
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+def build_features(df):
+    """Matriks fitur sparse: one-hot ter-hash untuk kategori + fitur numerik.
+
+    Hashing memberi ruang fitur tetap, jadi model bisa dilatih per chunk tanpa
+    mengetahui seluruh kategori lebih dulu. Kolom cuaca di dataset sudah
+    ternormalisasi 0-1; jam dikodekan siklis (sin/cos).
+    """
+    n = len(df)
+    h_origin, h_dest = _hash_codes(df["origin"]), _hash_codes(df["dest"])
+    hashed = {
+        "carrier": _hash_codes(df["carrier"]),
+        "origin": h_origin,
+        "dest": h_dest,
+        "route": h_origin * np.uint64(1_000_003) + h_dest,
+        "hour": _hash_codes(df["sched_hour"]),
+    }
+    cols = np.concatenate([
+        i * MODEL_HASH_BUCKETS + (hashed[f] % np.uint64(MODEL_HASH_BUCKETS)).astype(np.int64)
+        for i, f in enumerate(MODEL_CAT_FEATURES)
+    ])
+    rows = np.tile(np.arange(n), len(MODEL_CAT_FEATURES))
+    cat = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(n, len(MODEL_CAT_FEATURES) * MODEL_HASH_BUCKETS)
+    )
+
+    hour = df["sched_hour"].to_numpy(dtype=float)
+    angle = np.where(hour >= 0, 2 * np.pi * hour / 24, np.nan)
+    numeric = [np.nan_to_num(np.sin(angle)), np.nan_to_num(np.cos(angle))]
+    for col in MODEL_NUM_FEATURES:
+        values = df[col].to_numpy(dtype=float) if col in df.columns else np.zeros(n)
+        numeric.append(np.nan_to_num(values))
+    return sparse.hstack([cat, sparse.csr_matrix(np.column_stack(numeric))], format="csr")
+
+def train_delay_model(read_source, name, target):
+    """Latih SGDRegressor dengan partial_fit per chunk langsung dari file sumber.
+
+    MAE dihitung dengan progressive validation di epoch pertama: tiap potongan
+    chunk diprediksi dulu sebelum model pernah melihatnya, jadi MAE-nya
+    out-of-sample. Epoch berikutnya hanya melatih.
+    """
+    model = SGDRegressor(
+        loss="huber", epsilon=0.25, alpha=1e-5,
+        learning_rate="invscaling", eta0=0.01, random_state=42
+    )
+    rng = np.random.default_rng(42)
+    rows, processed, abs_err, n_err = 0, 0, 0.0, 0
+    t0 = time.perf_counter()
+    for epoch in range(MODEL_EPOCHS):
+        for chunk in iter_chunks(read_source(), name, MODEL_CHUNK_ROWS):
+            chunk = chunk[chunk[target].notna()]
+            if chunk.empty:
+                continue
+            chunk = chunk.iloc[rng.permutation(len(chunk))]
+            X = build_features(chunk)
+            y = chunk[target].to_numpy(dtype=float) / MODEL_TARGET_SCALE
+            if epoch == 0:
+                for part in np.array_split(np.arange(len(y)), min(MODEL_VALIDATION_SPLITS, len(y))):
+                    if hasattr(model, "coef_"):
+                        abs_err += np.abs(model.predict(X[part]) - y[part]).sum()
+                        n_err += len(part)
+                    model.partial_fit(X[part], y[part])
+                rows += len(y)
+            else:
+                model.partial_fit(X, y)
+            processed += len(y)
+    elapsed = time.perf_counter() - t0
+    if rows == 0:
+        raise ValueError(f"Tidak ada baris dengan nilai '{target}' untuk dilatih.")
+
+    logger.info(
+        "delay model %s: %d baris x %d epoch dilatih dalam %.2fs (%.0f baris/s)",
+        target, rows, MODEL_EPOCHS, elapsed, processed / elapsed
+    )
+    return {
+        "model": model,
+        "target": target,
+        "train_rows": rows,
+        "epochs": MODEL_EPOCHS,
+        "train_seconds": elapsed,
+        "train_rows_per_s": processed / elapsed,
+        "mae": abs_err / n_err * MODEL_TARGET_SCALE if n_err else float("nan"),
+    }
+
+def model_path(fingerprint, target):
+    return os.path.join(MODEL_DIR, f"delay_{fingerprint}_{target}_v{MODEL_VERSION}.joblib")
+
+@st.cache_resource(show_spinner="🧠 Melatih model prediksi delay...")
+def delay_model(fingerprint, target, name, _read_source):
+    # Model disimpan per sidik jari dataset: rerun / restart cukup memuat dari disk
+    path = model_path(fingerprint, target)
+    if os.path.exists(path):
+        return joblib.load(path)
+    bundle = train_delay_model(_read_source, name, target)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+    return bundle
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_predictions(data_key, filter_state, fingerprint, target, _bundle, _df):
+    # Satu batch vektor untuk seluruh data terfilter
+    t0 = time.perf_counter()
+    pred = _bundle["model"].predict(build_features(_df)) * MODEL_TARGET_SCALE
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+    logger.info("delay model %s: %d baris diprediksi dalam %.3fs", target, len(pred), elapsed)
+    return pred, len(pred) / elapsed
 
 # ==============================
 # SIDEBAR MENU
@@ -196,8 +1047,18 @@ with st.sidebar:
     )
 
 st.sidebar.markdown("---")
-use_full = st.sidebar.checkbox("Gunakan seluruh dataset (bisa lambat)", value=False)
-sample_n = None if use_full else st.sidebar.slider("Sample data (rows):", 1000, 20000, 10000, 1000)
+query_mode = st.sidebar.radio(
+    "Mode query:",
+    ["Approximate", "Exact"],
+    help="Approximate: KPI & rata-rata grup dihitung dari sampel yang diperbesar bertahap, lengkap dengan CI 95%."
+)
+approx_target, approx_budget = None, None
+if query_mode == "Approximate":
+    stop_rule = st.sidebar.radio("Berhenti saat:", ["Target akurasi", "Batas waktu"], horizontal=True)
+    if stop_rule == "Target akurasi":
+        approx_target = st.sidebar.slider("Target akurasi (± CI 95%, menit/°C):", 0.1, 10.0, 1.0, 0.1)
+    else:
+        approx_budget = st.sidebar.slider("Batas waktu (ms):", 50, 5000, 500, 50)
 
 # ==============================
 # PAGE: HOME
@@ -205,7 +1066,7 @@ if selected == "Home":
     col1, col2, col3 = st.columns([1, 3, 1])
 
     with col1:
-        st.image("upn_logo.png", width=130)
+        st.image(home_images["upn_logo.png"], width=HOME_IMAGES["upn_logo.png"])
 
     with col2:
         st.markdown(
@@ -224,7 +1085,7 @@ if selected == "Home":
         )
 
     with col3:
-        st.image("airplane_icon.png", width=120)
+        st.image(home_images["airplane_icon.png"], width=HOME_IMAGES["airplane_icon.png"])
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -279,19 +1140,23 @@ if selected == "Home":
 # ==============================
 elif selected == "Statistics & KPI":
     st.header("📈 Statistik & KPI")
+    preliminary_note()
 
-    df_stats = df if use_full else df.sample(n=min(sample_n, len(df)), random_state=42)
+    total_flights = len(df)
+    nan_kpi = (float("nan"), float("nan"), total_flights)
+    avg_total_delay, ci_delay, n_delay = approx_mean(df, "total_delay", approx_target, approx_budget) if "total_delay" in df else nan_kpi
+    avg_temp, ci_temp, n_temp = approx_mean(df, "temperature_c", approx_target, approx_budget) if "temperature_c" in df else nan_kpi
+    # Max tidak punya CI, tapi cukup satu pass vektor di data penuh
+    max_delay = df["total_delay"].max() if "total_delay" in df else float("nan")
 
-    total_flights = len(df_stats)
-    avg_total_delay = df_stats["total_delay"].mean() if "total_delay" in df_stats else float("nan")
-    avg_temp = df_stats["temperature_c"].mean() if "temperature_c" in df_stats else float("nan")
-    max_delay = df_stats["total_delay"].max() if "total_delay" in df_stats else float("nan")
+    n_used = max(n_delay, n_temp)
+    df_stats = df if n_used >= total_flights else df.iloc[np.unique(sample_rows(total_flights, n_used))]
     top_origin = df_stats["origin"].mode()[0] if "origin" in df_stats and not df_stats["origin"].mode().empty else "N/A"
 
     c1, c2, c3, c4, c5 = st.columns(5)
     c1.metric("Total Flights", f"{total_flights:,}")
-    c2.metric("Avg Total Delay (min)", f"{avg_total_delay:.2f}" if pd.notna(avg_total_delay) else "N/A")
-    c3.metric("Avg Temperature (°C)", f"{avg_temp:.1f}" if pd.notna(avg_temp) else "N/A")
+    c2.metric("Avg Total Delay (min)", fmt_ci(avg_total_delay, ci_delay))
+    c3.metric("Avg Temperature (°C)", fmt_ci(avg_temp, ci_temp, ".1f"))
     c4.metric("Max Delay (min)", f"{max_delay:.1f}" if pd.notna(max_delay) else "N/A")
     c5.metric("Most Frequent Origin", top_origin)
 
@@ -302,12 +1167,14 @@ elif selected == "Statistics & KPI":
     else:
         st.warning("Tidak ada kolom numerik ditemukan.")
     st.caption("📋 Statistik deskriptif berdasarkan data aktif.")
+    approx_caption(n_used, total_flights)
 
 # ==============================
 # PAGE: VISUALIZATION & INTERPRETATION
 # ==============================
 elif selected == "Visualization & Interpretation":
     st.header("📊 Visualisasi & Interpretasi Data")
+    preliminary_note()
 
     # ---------- Sidebar Filters ----------
     st.sidebar.subheader("🎛️ Filter Data Visualisasi")
@@ -366,11 +1233,26 @@ elif selected == "Visualization & Interpretation":
     if sel_delay and "total_delay" in df_vis.columns:
         df_vis = df_vis[(df_vis["total_delay"] >= sel_delay[0]) & (df_vis["total_delay"] <= sel_delay[1])]
 
-    # Sampling (biar gak berat)
-    df_vis_sample = df_vis if use_full else df_vis.sample(n=min(len(df_vis), sample_n), random_state=42)
+    # Identitas filter aktif, dipakai sebagai kunci cache hasil agregasi
+    filter_state = (
+        tuple(sel_origins), tuple(sel_dests), tuple(sel_carriers),
+        tuple(str(d) for d in sel_date) if "date" in df_vis.columns else None,
+        sel_delay,
+    )
+
+    # Sampling progresif (biar gak berat): sampel berhenti membesar saat
+    # rata-rata delay data terfilter sudah mencapai target akurasi / batas waktu
+    if "total_delay" in df_vis.columns and len(df_vis) > 0:
+        vis_delay, vis_ci, n_vis = approx_mean(df_vis, "total_delay", approx_target, approx_budget)
+    else:
+        vis_delay, vis_ci, n_vis = float("nan"), float("nan"), len(df_vis)
+    df_vis_sample = df_vis if n_vis >= len(df_vis) else df_vis.iloc[np.unique(sample_rows(len(df_vis), n_vis))]
 
     # Info dan download hasil filter
-    st.sidebar.success(f"✅ Data aktif: {len(df_vis_sample):,} baris")
+    st.sidebar.success(
+        f"✅ Data aktif: {len(df_vis_sample):,} dari {len(df_vis):,} baris · "
+        f"avg delay {fmt_ci(vis_delay, vis_ci)} menit"
+    )
     st.sidebar.download_button(
         "💾 Download filtered CSV",
         data=df_vis_sample.to_csv(index=False).encode("utf-8"),
@@ -392,7 +1274,10 @@ elif selected == "Visualization & Interpretation":
         " Diagram Lollipop",
         " Diagram Terbaik",
         " Heatmap Korelasi",
-        " Temperatur per Destinasi"
+        " Temperatur per Destinasi",
+        " Rotasi Pesawat",
+        " Heatmap Jam Keberangkatan",
+        " Prediksi Delay"
     ])
 
     # ========== 1️⃣ Tren Keterlambatan Harian ==========
@@ -455,15 +1340,15 @@ elif selected == "Visualization & Interpretation":
                 title_font=dict(size=18, color='#0074D9', family='Arial')
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Data kosong untuk tren harian.")
 
     # ========== 2️⃣ Performa Maskapai ==========
     with tabs[1]:
         # Hitung rata-rata keterlambatan kedatangan per maskapai
-        avg_delay = df.groupby('carrier')['arr_delay'].mean().reset_index()
-        avg_delay.columns = ['carrier', 'avg_arr_delay']
+        avg_delay, n_carrier, n_carrier_total = approx_group_mean(data_key, df, 'carrier', 'arr_delay', approx_target, approx_budget)
+        avg_delay = avg_delay.rename(columns={'arr_delay': 'avg_arr_delay'})
 
         # Balik tanda delay: terlambat -> negatif, lebih cepat -> positif
         avg_delay['adjusted_delay'] = -avg_delay['avg_arr_delay']
@@ -474,6 +1359,7 @@ elif selected == "Visualization & Interpretation":
             x='adjusted_delay',
             y='carrier',
             orientation='h',
+            error_x='ci' if n_carrier < n_carrier_total else None,
             color='adjusted_delay',
             color_continuous_scale=['navy', 'blue', 'skyblue'],
             title='Performa Ketepatan Waktu Kedatangan per Maskapai (Nilai Positif = Lebih Cepat)'
@@ -486,7 +1372,8 @@ elif selected == "Visualization & Interpretation":
             plot_bgcolor='white'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
+        approx_caption(n_carrier, n_carrier_total, avg_delay)
 
     # ========== 3️⃣ Diagram Pencar (wind_speed vs total_delay) ==========
     with tabs[2]:
@@ -507,7 +1394,7 @@ elif selected == "Visualization & Interpretation":
                 title_font=dict(size=18, color='#0074D9', family='Arial'),
                 plot_bgcolor='white'
             )
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Kolom 'wind_speed' atau 'total_delay' tidak ditemukan.")
 
@@ -545,7 +1432,7 @@ elif selected == "Visualization & Interpretation":
                 showlegend=False
             )
             fig.update_traces(marker=dict(line=dict(width=0)))
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Kolom 'humidity', 'arr_delay', atau 'distance' tidak ditemukan.")
 
@@ -597,7 +1484,7 @@ elif selected == "Visualization & Interpretation":
                 hovermode='x unified'
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Data kosong untuk area/stacked plot.")
 
@@ -640,7 +1527,7 @@ elif selected == "Visualization & Interpretation":
             legend_title_text='Maskapai'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
 
     # ========== 7️⃣ Diagram Tabel ==========
     with tabs[6]:
@@ -679,7 +1566,7 @@ elif selected == "Visualization & Interpretation":
             )
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
 
     # ========== 9️⃣ Histogram keterlambatan ==========
     with tabs[8]:
@@ -696,8 +1583,8 @@ elif selected == "Visualization & Interpretation":
                 df_delay, x="dep_delay", nbins=50,
                 title="Distribusi Delay Keberangkatan"
             )
-            st.plotly_chart(fig1, use_container_width=True)
-            st.plotly_chart(fig2, use_container_width=True)
+            render_chart(fig1)
+            render_chart(fig2)
         else:
             st.info("Kolom 'dep_delay' atau 'arr_delay' tidak ditemukan.")
 
@@ -707,7 +1594,8 @@ elif selected == "Visualization & Interpretation":
         df['route'] = df['origin'] + ' → ' + df['dest']
 
         # Hitung rata-rata keterlambatan per rute
-        route_delay = df.groupby('route')['arr_delay'].mean().sort_values(ascending=False).head(15).reset_index()
+        route_delay, n_route, n_route_total = approx_group_mean(data_key, df, 'route', 'arr_delay', approx_target, approx_budget)
+        route_delay = route_delay.sort_values('arr_delay', ascending=False).head(15)
 
         # Buat chart
         fig = go.Figure()
@@ -727,6 +1615,7 @@ elif selected == "Visualization & Interpretation":
             y=route_delay['route'],
             mode='markers',
             marker=dict(size=14, color='#1d65a6', line=dict(width=2, color='white')),
+            error_x=dict(type='data', array=route_delay['ci'], visible=n_route < n_route_total),
             name='Rata-rata Delay'
         ))
 
@@ -744,7 +1633,8 @@ elif selected == "Visualization & Interpretation":
             plot_bgcolor='rgba(0,0,0,0)',
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
+        approx_caption(n_route, n_route_total, route_delay)
 
     # ========== 1️⃣1️⃣ Diagram Terbaik (wind_speed vs delay_difference per carrier) ==========
     with tabs[10]:
@@ -758,7 +1648,7 @@ elif selected == "Visualization & Interpretation":
                 color_discrete_sequence=px.colors.sequential.Blues,
                 title='Pengaruh Kecepatan Angin terhadap Delay Difference per Maskapai'
             )
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Kolom yang diperlukan untuk visualisasi ini tidak lengkap.")
 
@@ -777,7 +1667,7 @@ elif selected == "Visualization & Interpretation":
                 color_continuous_scale="Blues",
                 title="Korelasi Faktor Cuaca terhadap Delay Difference"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Data tidak cukup untuk menghitung korelasi faktor cuaca.")
 
@@ -832,9 +1722,166 @@ elif selected == "Visualization & Interpretation":
                 plot_bgcolor='white'
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         else:
             st.info("Kolom 'temperature' atau 'dest' tidak ditemukan.")
+
+    # ========== 1️⃣4️⃣ Rotasi Pesawat (propagasi delay per tailnum) ==========
+    with tabs[13]:
+        if set(ROTATION_COLS).issubset(df.columns):
+            rotations = cached_rotations(data_key, df)
+            tail_summary = rotations['tail_summary']
+            total_dep = rotations['propagated_total'] + rotations['originated_total']
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Jumlah Pesawat", f"{len(tail_summary):,}")
+            c2.metric("Leg Lanjutan Rotasi", f"{rotations['n_connected']:,}")
+            c3.metric("Porsi Delay Propagasi", f"{rotations['propagated_total'] / total_dep:.1%}" if total_dep > 0 else "N/A")
+            c4.metric("Median Slack (menit)", f"{rotations['slack_median']:.0f}" if rotations['n_connected'] else "N/A")
+
+            # Top 15 pesawat dengan delay propagasi terbesar
+            top_tails = tail_summary.head(15).melt(
+                id_vars='tailnum',
+                value_vars=['propagated_delay', 'originated_delay'],
+                var_name='jenis',
+                value_name='menit'
+            )
+            top_tails['jenis'] = top_tails['jenis'].map({
+                'propagated_delay': 'Propagasi', 'originated_delay': 'Orisinal'
+            })
+            fig = px.bar(
+                top_tails,
+                x='menit',
+                y='tailnum',
+                color='jenis',
+                orientation='h',
+                barmode='stack',
+                color_discrete_map={'Propagasi': '#0b3c5d', 'Orisinal': '#89cff0'},
+                title='Top 15 Pesawat dengan Delay Propagasi Terbesar'
+            )
+            fig.update_layout(
+                xaxis_title="Total Delay Keberangkatan (menit)",
+                yaxis_title="Tail Number",
+                yaxis=dict(categoryorder='total ascending'),
+                title_font=dict(size=18, color='#003F7F', family='Arial'),
+                plot_bgcolor='white',
+                legend_title_text='Asal Delay'
+            )
+            render_chart(fig)
+
+            if rotations['n_connected']:
+                edges = rotations['slack_edges']
+                fig = go.Figure(go.Bar(
+                    x=(edges[:-1] + edges[1:]) / 2,
+                    y=rotations['slack_counts'],
+                    width=np.diff(edges),
+                    marker_color='#1d65a6'
+                ))
+                fig.update_layout(
+                    title='Distribusi Slack Turnaround Terjadwal (menit)',
+                    xaxis_title="Slack terhadap leg sebelumnya (menit)",
+                    yaxis_title="Jumlah Leg",
+                    plot_bgcolor='white'
+                )
+                render_chart(fig)
+
+            st.dataframe(tail_summary.head(50), use_container_width=True)
+            st.caption(
+                f"Rotasi: leg berurutan pesawat yang sama dengan jeda ≤ {ROTATION_MAX_GAP_H} jam. "
+                f"Delay masuk yang melebihi slack dikurangi {ROTATION_MIN_TURN_MIN} menit turnaround "
+                "minimum dihitung sebagai propagasi."
+            )
+        else:
+            st.info("Kolom 'tailnum', jadwal, atau delay tidak lengkap untuk analisis rotasi.")
+
+    # ========== 1️⃣5️⃣ Heatmap Delay per Jam × Hari / Origin ==========
+    with tabs[14]:
+        delay_options = [c for c in ['total_delay', 'dep_delay', 'arr_delay'] if c in df_vis.columns]
+        if {'sched_hour', 'sched_weekday', 'origin'}.issubset(df_vis.columns) and delay_options and not df_vis.empty:
+            value_col = st.selectbox("Metrik delay:", delay_options, key="heatmap_metric")
+            by_weekday, by_origin = cached_time_heatmaps(data_key, filter_state, value_col, df_vis)
+
+            for grid, y_title, title in [
+                (by_weekday, "Hari", "Rata-rata Delay per Jam Terjadwal × Hari"),
+                (by_origin, "Origin", "Rata-rata Delay per Jam Terjadwal × Bandara Asal"),
+            ]:
+                fig = px.imshow(
+                    grid,
+                    aspect="auto",
+                    color_continuous_scale="Blues",
+                    labels={'x': 'Jam Keberangkatan Terjadwal', 'y': y_title, 'color': 'Delay (menit)'},
+                    title=title
+                )
+                fig.update_xaxes(dtick=1)
+                fig.update_layout(title_font=dict(size=18, color='#003F7F', family='Arial'))
+                render_chart(fig)
+            st.caption("🕒 Berdasarkan data terfilter; sel kosong berarti tidak ada penerbangan terjadwal.")
+        else:
+            st.info("Data terfilter kosong atau kolom 'sched_dep_time', 'origin', dan delay tidak lengkap.")
+
+    # ========== 1️⃣6️⃣ Prediksi Delay ==========
+    with tabs[15]:
+        target_options = [c for c in ['arr_delay', 'total_delay'] if c in df_vis.columns]
+        if set(MODEL_REQUIRED).issubset(df_vis.columns) and target_options:
+            target = st.selectbox("Target prediksi:", target_options, key="model_target")
+            fingerprint = data_fingerprint
+            cache_path = arrow_cache_path(fingerprint)
+            if os.path.exists(cache_path):
+                # Latih dari cache Arrow bersama, tanpa parsing ulang file sumber
+                train_name, train_source = cache_path, (lambda: cache_path)
+            else:
+                train_name, train_source = source_name, read_source
+
+            if os.path.exists(model_path(fingerprint, target)) or st.button("🚀 Latih model", key="train_model"):
+                try:
+                    bundle = delay_model(fingerprint, target, train_name, train_source)
+                except Exception as e:
+                    bundle = None
+                    st.error(f"Gagal melatih model: {e}")
+                if bundle is None:
+                    pass
+                elif df_vis.empty:
+                    st.info("Data terfilter kosong, tidak ada yang diprediksi.")
+                else:
+                    pred, score_rate = cached_predictions(data_key, filter_state, fingerprint, target, bundle, df_vis)
+                    scored = df_vis[['carrier', target]].assign(predicted=pred)
+                    actual = scored[target].notna()
+                    mae = (scored.loc[actual, 'predicted'] - scored.loc[actual, target]).abs().mean()
+
+                    c1, c2, c3, c4 = st.columns(4)
+                    c1.metric("MAE Data Terfilter (menit)", f"{mae:.2f}" if pd.notna(mae) else "N/A")
+                    c2.metric("MAE Validasi Out-of-Sample (menit)", f"{bundle['mae']:.2f}" if pd.notna(bundle['mae']) else "N/A")
+                    c3.metric("Throughput Latih (baris/s)", f"{bundle['train_rows_per_s']:,.0f}")
+                    c4.metric("Throughput Prediksi (baris/s)", f"{score_rate:,.0f}")
+
+                    per_carrier = scored.groupby('carrier')[[target, 'predicted']].mean().reset_index()
+                    per_carrier = per_carrier.rename(columns={target: 'Aktual', 'predicted': 'Prediksi'})
+                    fig = px.bar(
+                        per_carrier.melt(id_vars='carrier', var_name='jenis', value_name='delay'),
+                        x='carrier',
+                        y='delay',
+                        color='jenis',
+                        barmode='group',
+                        color_discrete_map={'Aktual': '#0b3c5d', 'Prediksi': '#89cff0'},
+                        title='Rata-rata Delay Aktual vs Prediksi per Maskapai'
+                    )
+                    fig.update_layout(
+                        xaxis_title="Kode Maskapai",
+                        yaxis_title="Rata-rata Delay (menit)",
+                        title_font=dict(size=18, color='#003F7F', family='Arial'),
+                        plot_bgcolor='white',
+                        legend_title_text=''
+                    )
+                    render_chart(fig)
+                    st.caption(
+                        f"🧠 SGDRegressor (partial_fit, {bundle['epochs']} epoch) dilatih pada "
+                        f"{bundle['train_rows']:,} baris unik dalam {bundle['train_seconds']:.1f} detik; "
+                        f"fitur: maskapai, rute, jam, dan cuaca."
+                    )
+            else:
+                st.info("Model untuk dataset ini belum ada. Klik **Latih model** untuk melatih sekali dan menyimpannya.")
+        else:
+            st.info("Kolom maskapai, rute, jam terjadwal, atau target delay tidak lengkap.")
 # ==============================
 # PAGE: ABOUT
 # ==============================